@@ -13,12 +13,15 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent / 'src'))
 
 from analyzer import ScoreAnalyzer
+from table_io import load_table
 
 def main():
     parser = argparse.ArgumentParser(description='Generate analysis report from wallet scores')
-    parser.add_argument('--scores', required=True, help='Path to wallet scores CSV file')
-    parser.add_argument('--features', help='Path to features CSV file (optional)')
+    parser.add_argument('--scores', required=True, help='Path to wallet scores CSV or Parquet file')
+    parser.add_argument('--features', help='Path to features CSV or Parquet file (optional)')
     parser.add_argument('--output', default='analysis.md', help='Output markdown file path')
+    parser.add_argument('--cache-dir', help='Directory for caching analysis results (disabled by default; '
+                                             'clear it after changing analyzer code)')
     
     args = parser.parse_args()
     
@@ -30,13 +33,13 @@ def main():
         logger.info("Generating analysis report...")
         
         # Load scores
-        scores_df = pd.read_csv(args.scores)
+        scores_df = load_table(args.scores, columns=['wallet_address', 'credit_score', 'risk_category'])
         logger.info(f"Loaded scores for {len(scores_df)} wallets")
         
         # Load features if provided
         features_df = None
         if args.features and Path(args.features).exists():
-            features_df = pd.read_csv(args.features)
+            features_df = load_table(args.features)
             logger.info(f"Loaded features for {len(features_df)} wallets")
         else:
             logger.info("No features file provided, generating basic analysis")
@@ -48,7 +51,7 @@ def main():
             })
         
         # Generate analysis
-        analyzer = ScoreAnalyzer()
+        analyzer = ScoreAnalyzer(cache_dir=args.cache_dir)
         analysis = analyzer.generate_comprehensive_analysis(scores_df, features_df)
         
         # Generate markdown report
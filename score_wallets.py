@@ -5,8 +5,7 @@ Takes JSON transaction data as input and outputs wallet scores (0-1000).
 """
 
 import argparse
-import json
-import pandas as pd
+import numpy as np
 import sys
 import logging
 from pathlib import Path
@@ -18,6 +17,7 @@ from data_processor import DataProcessor
 from feature_engineer import FeatureEngineer
 from model_trainer import ModelTrainer
 from scorer import WalletScorer
+from table_io import save_table
 
 def setup_logging():
     """Setup logging configuration."""
@@ -34,7 +34,8 @@ def main():
     """Main scoring pipeline."""
     parser = argparse.ArgumentParser(description='Score DeFi wallets based on Aave V2 transactions')
     parser.add_argument('--input', required=True, help='Path to JSON transaction file')
-    parser.add_argument('--output', required=True, help='Path to output CSV file')
+    parser.add_argument('--output', required=True, help='Path to output scores file (.csv, or .parquet for Parquet)')
+    parser.add_argument('--features-output', help='Path to save engineered features (optional, .csv or .parquet)')
     parser.add_argument('--retrain', action='store_true', help='Retrain the model with new data')
     parser.add_argument('--model-path', default='models/wallet_scorer.joblib', help='Path to save/load model')
     
@@ -48,11 +49,10 @@ def main():
         
         # Load and process data
         logger.info(f"Loading transaction data from {args.input}")
-        with open(args.input, 'r') as f:
-            transactions_data = json.load(f)
+        data_processor = DataProcessor()
+        transactions_data = data_processor.load_transactions(args.input)
         
         # Initialize components
-        data_processor = DataProcessor()
         feature_engineer = FeatureEngineer()
         
         # Process transactions
@@ -81,7 +81,11 @@ def main():
         
         # Save results
         logger.info(f"Saving results to {args.output}")
-        scores.to_csv(args.output, index=False)
+        save_table(scores, args.output)
+        
+        if args.features_output:
+            logger.info(f"Saving features to {args.features_output}")
+            save_table(features_df, args.features_output)
         
         # Print summary statistics
         logger.info("Scoring Summary:")
@@ -89,9 +93,9 @@ def main():
         logger.info(f"Average score: {scores['credit_score'].mean():.2f}")
         logger.info(f"Score range: {scores['credit_score'].min():.2f} - {scores['credit_score'].max():.2f}")
         
-        # Score distribution
-        score_bins = pd.cut(scores['credit_score'], bins=10, labels=False)
-        distribution = score_bins.value_counts().sort_index()
+        # Score distribution (scores of 1000 fall into the top bucket)
+        score_buckets = np.clip(scores['credit_score'].to_numpy() // 100, 0, 9).astype(np.int64)
+        distribution = np.bincount(score_buckets, minlength=10)
         logger.info("Score distribution by decile:")
         for i, count in enumerate(distribution):
             bin_start = i * 100
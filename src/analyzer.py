@@ -2,19 +2,27 @@
 Analysis module for generating comprehensive reports on wallet scoring results.
 """
 
+import io
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from joblib import Memory
 
 class ScoreAnalyzer:
     """Analyzes wallet scoring results and generates comprehensive reports."""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
-        plt.style.use('seaborn-v0_8')
+        
+        # Optionally memoize the analysis steps on disk, keyed on their input
+        # DataFrames; joblib only hashes each step's own source, not the helpers
+        # it calls, so the cache must be cleared after editing analyzer code
+        if cache_dir is not None:
+            memory = Memory(cache_dir, verbose=0)
+            for name in ['_analyze_score_distribution', '_analyze_behavioral_patterns',
+                         '_analyze_risk_factors', '_comparative_analysis']:
+                setattr(self, name, memory.cache(getattr(self, name), ignore=['self']))
     
     def generate_comprehensive_analysis(self, scores_df: pd.DataFrame, features_df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -31,17 +39,20 @@ class ScoreAnalyzer:
         
         analysis = {}
         
+        # Merge scores with features once for all feature-based analyses
+        merged_df = scores_df.merge(features_df, on='wallet_address', how='inner')
+        
         # Score distribution analysis
         analysis['score_distribution'] = self._analyze_score_distribution(scores_df)
         
         # Behavioral pattern analysis
-        analysis['behavioral_patterns'] = self._analyze_behavioral_patterns(scores_df, features_df)
+        analysis['behavioral_patterns'] = self._analyze_behavioral_patterns(merged_df)
         
         # Risk factor analysis
-        analysis['risk_factors'] = self._analyze_risk_factors(scores_df, features_df)
+        analysis['risk_factors'] = self._analyze_risk_factors(merged_df)
         
         # Comparative analysis
-        analysis['comparative_analysis'] = self._comparative_analysis(scores_df, features_df)
+        analysis['comparative_analysis'] = self._comparative_analysis(merged_df)
         
         return analysis
     
@@ -50,58 +61,63 @@ class ScoreAnalyzer:
         scores = scores_df['credit_score']
         
         # Basic statistics
+        desc = scores.describe(percentiles=[0.25, 0.50, 0.75])
         distribution = {
             'total_wallets': len(scores),
-            'mean_score': scores.mean(),
-            'median_score': scores.median(),
-            'std_score': scores.std(),
-            'min_score': scores.min(),
-            'max_score': scores.max(),
+            'mean_score': desc['mean'],
+            'median_score': desc['50%'],
+            'std_score': desc['std'],
+            'min_score': desc['min'],
+            'max_score': desc['max'],
             'quartiles': {
-                'q1': scores.quantile(0.25),
-                'q2': scores.quantile(0.50),
-                'q3': scores.quantile(0.75)
+                'q1': desc['25%'],
+                'q2': desc['50%'],
+                'q3': desc['75%']
             }
         }
         
-        # Score buckets (0-100, 100-200, etc.)
+        # Score buckets (0-99, 100-199, ..., 900-1000); missing and out-of-range scores are left out
         bins = np.arange(0, 1001, 100)
         bucket_labels = [f"{bins[i]}-{bins[i+1]-1}" for i in range(len(bins)-1)]
-        bucket_counts = pd.cut(scores, bins=bins, labels=bucket_labels, include_lowest=True).value_counts()
-        
-        distribution['bucket_distribution'] = {}
-        for bucket, count in bucket_counts.items():
-            percentage = (count / len(scores)) * 100
-            distribution['bucket_distribution'][str(bucket)] = {
-                'count': int(count),
-                'percentage': round(percentage, 2)
-            }
+        values = scores.to_numpy(dtype=float, na_value=np.nan)
+        values = values[(values >= 0) & (values <= 1000)]
+        bucket_codes = np.minimum(values // 100, 9).astype(np.int64)
+        bucket_counts = pd.Series(np.bincount(bucket_codes, minlength=10), index=bucket_labels)
         
-        # Risk category distribution
-        category_counts = scores_df['risk_category'].value_counts()
-        distribution['risk_category_distribution'] = {}
-        for category, count in category_counts.items():
-            percentage = (count / len(scores)) * 100
-            distribution['risk_category_distribution'][category] = {
-                'count': int(count),
-                'percentage': round(percentage, 2)
-            }
+        distribution['bucket_distribution'] = self._count_table(bucket_counts, len(scores))
+        
+        # Risk category distribution, most common first
+        category_codes, categories = pd.factorize(scores_df['risk_category'])
+        category_counts = pd.Series(
+            np.bincount(category_codes[category_codes >= 0], minlength=len(categories)),
+            index=categories
+        ).sort_values(ascending=False, kind='stable')
+        distribution['risk_category_distribution'] = self._count_table(category_counts, len(scores))
         
         return distribution
     
-    def _analyze_behavioral_patterns(self, scores_df: pd.DataFrame, features_df: pd.DataFrame) -> Dict[str, Any]:
+    def _count_table(self, counts: pd.Series, total: int) -> Dict[str, Dict[str, Any]]:
+        """Convert value counts into a {label: {'count', 'percentage'}} mapping."""
+        counts = counts.astype(int)
+        table = pd.DataFrame({
+            'count': counts,
+            'percentage': (counts * 100.0 / total).round(2)
+        })
+        table.index = table.index.astype(str)
+        return table.to_dict(orient='index')
+    
+    def _analyze_behavioral_patterns(self, merged_df: pd.DataFrame) -> Dict[str, Any]:
         """Analyze behavioral patterns across different score ranges."""
-        # Merge scores with features
-        merged_df = pd.merge(scores_df, features_df, on='wallet_address')
-        
         patterns = {}
         
-        # Define score groups
-        score_groups = {
-            'high_score': merged_df[merged_df['credit_score'] >= 700],
-            'medium_score': merged_df[(merged_df['credit_score'] >= 400) & (merged_df['credit_score'] < 700)],
-            'low_score': merged_df[merged_df['credit_score'] < 400]
-        }
+        # Bucket wallets into score groups: [0, 400), [400, 700), [700, 1000]
+        score_groups = pd.cut(
+            merged_df['credit_score'],
+            bins=[-np.inf, 400, 700, np.inf],
+            labels=['low_score', 'medium_score', 'high_score'],
+            right=False
+        )
+        group_counts = score_groups.value_counts()
         
         # Analyze key behavioral metrics for each group
         behavioral_metrics = [
@@ -109,26 +125,30 @@ class ScoreAnalyzer:
             'leverage_ratio', 'asset_diversity_score', 'account_age_days',
             'time_regularity_score', 'transaction_complexity'
         ]
+        present_metrics = [m for m in behavioral_metrics if m in merged_df.columns]
+        
+        if present_metrics:
+            group_stats = merged_df.groupby(score_groups, observed=True)[present_metrics].agg(
+                ['mean', 'median', 'std']
+            )
         
-        for group_name, group_data in score_groups.items():
-            if len(group_data) > 0:
+        for group_name in ['high_score', 'medium_score', 'low_score']:
+            if group_counts.get(group_name, 0) > 0:
                 patterns[group_name] = {}
-                patterns[group_name]['count'] = len(group_data)
+                patterns[group_name]['count'] = int(group_counts[group_name])
                 
-                for metric in behavioral_metrics:
-                    if metric in group_data.columns:
-                        patterns[group_name][metric] = {
-                            'mean': float(group_data[metric].mean()),
-                            'median': float(group_data[metric].median()),
-                            'std': float(group_data[metric].std())
-                        }
+                for metric in present_metrics:
+                    stats = group_stats.loc[group_name, metric]
+                    patterns[group_name][metric] = {
+                        'mean': float(stats['mean']),
+                        'median': float(stats['median']),
+                        'std': float(stats['std'])
+                    }
         
         return patterns
     
-    def _analyze_risk_factors(self, scores_df: pd.DataFrame, features_df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_risk_factors(self, merged_df: pd.DataFrame) -> Dict[str, Any]:
         """Analyze key risk factors and their correlation with scores."""
-        merged_df = pd.merge(scores_df, features_df, on='wallet_address')
-        
         risk_factors = {}
         
         # Key risk indicators
@@ -138,13 +158,10 @@ class ScoreAnalyzer:
             'amount_uniformity_score', 'gas_optimization_score'
         ]
         
-        correlations = {}
-        for indicator in risk_indicators:
-            if indicator in merged_df.columns:
-                correlation = merged_df['credit_score'].corr(merged_df[indicator])
-                correlations[indicator] = float(correlation) if not np.isnan(correlation) else 0.0
+        present_indicators = [i for i in risk_indicators if i in merged_df.columns]
+        correlations = merged_df[present_indicators].corrwith(merged_df['credit_score']).fillna(0.0)
         
-        risk_factors['score_correlations'] = correlations
+        risk_factors['score_correlations'] = correlations.astype(float).to_dict()
         
         # High-risk wallet analysis
         high_risk_wallets = merged_df[merged_df['credit_score'] < 400]
@@ -158,16 +175,12 @@ class ScoreAnalyzer:
         
         return risk_factors
     
-    def _comparative_analysis(self, scores_df: pd.DataFrame, features_df: pd.DataFrame) -> Dict[str, Any]:
+    def _comparative_analysis(self, merged_df: pd.DataFrame) -> Dict[str, Any]:
         """Compare high-scoring vs low-scoring wallets."""
-        merged_df = pd.merge(scores_df, features_df, on='wallet_address')
-        
-        # Define comparison groups
-        high_score_threshold = merged_df['credit_score'].quantile(0.8)
-        low_score_threshold = merged_df['credit_score'].quantile(0.2)
-        
-        high_scorers = merged_df[merged_df['credit_score'] >= high_score_threshold]
-        low_scorers = merged_df[merged_df['credit_score'] <= low_score_threshold]
+        # Define comparison groups: top and bottom 20% of wallets by score
+        group_size = max(1, int(0.2 * len(merged_df)))
+        high_scorers = merged_df.nlargest(group_size, 'credit_score')
+        low_scorers = merged_df.nsmallest(group_size, 'credit_score')
         
         comparison = {
             'high_scorers': {
@@ -186,106 +199,111 @@ class ScoreAnalyzer:
             'repayment_ratio', 'liquidation_ratio', 'leverage_ratio'
         ]
         
-        comparison['metric_differences'] = {}
-        for metric in comparison_metrics:
-            if metric in merged_df.columns:
-                high_avg = high_scorers[metric].mean() if len(high_scorers) > 0 else 0
-                low_avg = low_scorers[metric].mean() if len(low_scorers) > 0 else 0
-                
-                comparison['metric_differences'][metric] = {
-                    'high_scorers_avg': float(high_avg),
-                    'low_scorers_avg': float(low_avg),
-                    'difference_ratio': high_avg / low_avg if low_avg != 0 else float('inf')
-                }
+        present_metrics = [m for m in comparison_metrics if m in merged_df.columns]
+        
+        empty_avgs = pd.Series(0.0, index=present_metrics)
+        high_avgs = high_scorers[present_metrics].mean() if len(high_scorers) > 0 else empty_avgs
+        low_avgs = low_scorers[present_metrics].mean() if len(low_scorers) > 0 else empty_avgs
+        ratios = (high_avgs / low_avgs).where(low_avgs != 0, np.inf)
+        
+        comparison['metric_differences'] = {
+            metric: {
+                'high_scorers_avg': float(high_avgs[metric]),
+                'low_scorers_avg': float(low_avgs[metric]),
+                'difference_ratio': float(ratios[metric])
+            }
+            for metric in present_metrics
+        }
         
         return comparison
     
     def generate_markdown_report(self, analysis: Dict[str, Any]) -> str:
         """Generate a markdown report from analysis results."""
-        report = "# DeFi Credit Scoring Analysis Report\n\n"
+        report = io.StringIO()
+        report.write("# DeFi Credit Scoring Analysis Report\n\n")
         
         # Executive Summary
-        report += "## Executive Summary\n\n"
+        report.write("## Executive Summary\n\n")
         dist = analysis['score_distribution']
-        report += f"This analysis covers **{dist['total_wallets']:,}** wallets with an average credit score of **{dist['mean_score']:.0f}**.\n\n"
+        report.write(f"This analysis covers **{dist['total_wallets']:,}** wallets with an average credit score of **{dist['mean_score']:.0f}**.\n\n")
         
         # Score Distribution
-        report += "## Score Distribution\n\n"
-        report += f"- **Mean Score**: {dist['mean_score']:.2f}\n"
-        report += f"- **Median Score**: {dist['median_score']:.2f}\n"
-        report += f"- **Standard Deviation**: {dist['std_score']:.2f}\n"
-        report += f"- **Score Range**: {dist['min_score']:.0f} - {dist['max_score']:.0f}\n\n"
+        report.write("## Score Distribution\n\n")
+        report.write(f"- **Mean Score**: {dist['mean_score']:.2f}\n")
+        report.write(f"- **Median Score**: {dist['median_score']:.2f}\n")
+        report.write(f"- **Standard Deviation**: {dist['std_score']:.2f}\n")
+        report.write(f"- **Score Range**: {dist['min_score']:.0f} - {dist['max_score']:.0f}\n\n")
         
         # Bucket Distribution
-        report += "### Score Distribution by Buckets\n\n"
-        report += "| Score Range | Count | Percentage |\n"
-        report += "|-------------|-------|------------|\n"
+        report.write("### Score Distribution by Buckets\n\n")
+        report.write("| Score Range | Count | Percentage |\n")
+        report.write("|-------------|-------|------------|\n")
         
         for bucket, data in dist['bucket_distribution'].items():
-            report += f"| {bucket} | {data['count']:,} | {data['percentage']:.1f}% |\n"
+            report.write(f"| {bucket} | {data['count']:,} | {data['percentage']:.1f}% |\n")
         
-        report += "\n"
+        report.write("\n")
         
         # Risk Categories
-        report += "### Risk Category Distribution\n\n"
-        report += "| Risk Category | Count | Percentage |\n"
-        report += "|---------------|-------|------------|\n"
+        report.write("### Risk Category Distribution\n\n")
+        report.write("| Risk Category | Count | Percentage |\n")
+        report.write("|---------------|-------|------------|\n")
         
         for category, data in dist['risk_category_distribution'].items():
-            report += f"| {category} | {data['count']:,} | {data['percentage']:.1f}% |\n"
+            report.write(f"| {category} | {data['count']:,} | {data['percentage']:.1f}% |\n")
         
-        report += "\n"
+        report.write("\n")
         
         # Behavioral Patterns
         if 'behavioral_patterns' in analysis:
-            report += "## Behavioral Pattern Analysis\n\n"
+            report.write("## Behavioral Pattern Analysis\n\n")
             patterns = analysis['behavioral_patterns']
             
             for group_name, group_data in patterns.items():
                 if isinstance(group_data, dict) and 'count' in group_data:
-                    report += f"### {group_name.replace('_', ' ').title()} ({group_data['count']} wallets)\n\n"
+                    report.write(f"### {group_name.replace('_', ' ').title()} ({group_data['count']} wallets)\n\n")
                     
                     for metric, stats in group_data.items():
                         if metric != 'count' and isinstance(stats, dict):
-                            report += f"- **{metric.replace('_', ' ').title()}**: {stats['mean']:.2f} (avg), {stats['median']:.2f} (median)\n"
+                            report.write(f"- **{metric.replace('_', ' ').title()}**: {stats['mean']:.2f} (avg), {stats['median']:.2f} (median)\n")
                     
-                    report += "\n"
+                    report.write("\n")
         
         # Risk Factor Analysis
         if 'risk_factors' in analysis:
-            report += "## Risk Factor Analysis\n\n"
+            report.write("## Risk Factor Analysis\n\n")
             risk_factors = analysis['risk_factors']
             
             if 'score_correlations' in risk_factors:
-                report += "### Risk Factor Correlations with Credit Score\n\n"
-                report += "| Risk Factor | Correlation |\n"
-                report += "|-------------|-------------|\n"
+                report.write("### Risk Factor Correlations with Credit Score\n\n")
+                report.write("| Risk Factor | Correlation |\n")
+                report.write("|-------------|-------------|\n")
                 
                 sorted_correlations = sorted(risk_factors['score_correlations'].items(), 
                                            key=lambda x: abs(x[1]), reverse=True)
                 
                 for factor, correlation in sorted_correlations:
-                    report += f"| {factor.replace('_', ' ').title()} | {correlation:.3f} |\n"
+                    report.write(f"| {factor.replace('_', ' ').title()} | {correlation:.3f} |\n")
                 
-                report += "\n"
+                report.write("\n")
         
         # Comparative Analysis
         if 'comparative_analysis' in analysis:
-            report += "## High vs Low Scorer Comparison\n\n"
+            report.write("## High vs Low Scorer Comparison\n\n")
             comp = analysis['comparative_analysis']
             
-            report += f"- **High Scorers**: {comp['high_scorers']['count']} wallets (scores {comp['high_scorers']['score_range']})\n"
-            report += f"- **Low Scorers**: {comp['low_scorers']['count']} wallets (scores {comp['low_scorers']['score_range']})\n\n"
+            report.write(f"- **High Scorers**: {comp['high_scorers']['count']} wallets (scores {comp['high_scorers']['score_range']})\n")
+            report.write(f"- **Low Scorers**: {comp['low_scorers']['count']} wallets (scores {comp['low_scorers']['score_range']})\n\n")
             
             if 'metric_differences' in comp:
-                report += "### Key Metric Differences\n\n"
-                report += "| Metric | High Scorers | Low Scorers | Ratio |\n"
-                report += "|--------|--------------|-------------|-------|\n"
+                report.write("### Key Metric Differences\n\n")
+                report.write("| Metric | High Scorers | Low Scorers | Ratio |\n")
+                report.write("|--------|--------------|-------------|-------|\n")
                 
                 for metric, data in comp['metric_differences'].items():
                     ratio_str = f"{data['difference_ratio']:.2f}x" if data['difference_ratio'] != float('inf') else "∞"
-                    report += f"| {metric.replace('_', ' ').title()} | {data['high_scorers_avg']:.2f} | {data['low_scorers_avg']:.2f} | {ratio_str} |\n"
+                    report.write(f"| {metric.replace('_', ' ').title()} | {data['high_scorers_avg']:.2f} | {data['low_scorers_avg']:.2f} | {ratio_str} |\n")
         
-        report += "\n---\n\n*Report generated by DeFi Credit Scoring System*\n"
+        report.write("\n---\n\n*Report generated by DeFi Credit Scoring System*\n")
         
-        return report
\ No newline at end of file
+        return report.getvalue()
\ No newline at end of file
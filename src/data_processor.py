@@ -2,10 +2,13 @@
 Data processing module for cleaning and preparing Aave V2 transaction data.
 """
 
+import json
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
 from datetime import datetime
 
 class DataProcessor:
@@ -13,16 +16,23 @@ class DataProcessor:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.valid_actions = {
+        self.valid_actions = [
             'deposit', 'borrow', 'repay', 'redeemunderlying', 'liquidationcall'
-        }
+        ]
+    
+    def load_transactions(self, path: str) -> List[Dict[str, Any]]:
+        """Load raw transactions from a JSON file."""
+        # json.load keeps integers of any size (e.g. wei amounts beyond uint64),
+        # which pd.read_json rejects; _convert_types turns them into floats
+        with open(path, 'r') as f:
+            return json.load(f)
     
-    def process_transactions(self, raw_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    def process_transactions(self, raw_data: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
         """
         Process raw transaction data into clean DataFrame.
         
         Args:
-            raw_data: List of transaction dictionaries
+            raw_data: List of transaction dictionaries or an already loaded DataFrame
             
         Returns:
             Cleaned DataFrame with processed transactions
@@ -30,7 +40,7 @@ class DataProcessor:
         self.logger.info(f"Processing {len(raw_data)} raw transactions...")
         
         # Convert to DataFrame
-        df = pd.DataFrame(raw_data)
+        df = raw_data if isinstance(raw_data, pd.DataFrame) else pd.DataFrame(raw_data)
         
         # Data validation and cleaning
         df = self._validate_and_clean(df)
@@ -50,20 +60,23 @@ class DataProcessor:
         
         # Remove transactions with missing critical fields
         required_fields = ['wallet_address', 'action', 'amount', 'timestamp']
-        df = df.dropna(subset=required_fields)
-        
-        # Filter valid actions
-        df = df[df['action'].isin(self.valid_actions)]
+        valid_rows = df[required_fields].notna().all(axis=1)
         
-        # Remove zero or negative amounts (except for certain actions)
-        df = df[df['amount'] > 0]
+        # Filter valid actions: unknown actions map to the missing category code (-1)
+        actions = pd.Categorical(df['action'], categories=self.valid_actions)
+        valid_rows &= actions.codes >= 0
         
-        # Remove obvious test transactions (very small amounts)
+        # Remove zero or negative amounts and obvious test transactions (very small amounts)
         min_amount_threshold = 1e-10
-        df = df[df['amount'] >= min_amount_threshold]
+        valid_rows &= df['amount'] >= min_amount_threshold
         
-        # Normalize wallet addresses
-        df['wallet_address'] = df['wallet_address'].str.lower()
+        df = df.loc[valid_rows]
+        df['action'] = actions[valid_rows.to_numpy()]
+        
+        # Normalize wallet addresses with Arrow's vectorized lowercase kernel
+        # and keep the result Arrow-backed instead of boxing it into Python strings
+        addresses = pc.utf8_lower(pa.array(df['wallet_address'], type=pa.string()))
+        df['wallet_address'] = pd.Series(pd.arrays.ArrowExtensionArray(addresses), index=df.index)
         
         cleaned_count = len(df)
         self.logger.info(f"Cleaned data: {initial_count} -> {cleaned_count} transactions")
@@ -87,8 +100,8 @@ class DataProcessor:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
-        # Convert categorical columns
-        categorical_columns = ['action', 'asset', 'wallet_address']
+        # Convert categorical columns (action is already categorical after validation)
+        categorical_columns = ['asset', 'wallet_address']
         for col in categorical_columns:
             if col in df.columns:
                 df[col] = df[col].astype('category')
@@ -97,10 +110,11 @@ class DataProcessor:
     
     def _add_derived_fields(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add derived fields for analysis."""
-        # Add time-based features
-        df['hour'] = df['timestamp'].dt.hour
-        df['day_of_week'] = df['timestamp'].dt.dayofweek
-        df['month'] = df['timestamp'].dt.month
+        # Add time-based features using Arrow's vectorized temporal kernels
+        timestamps = pa.array(df['timestamp'])
+        df['hour'] = pc.hour(timestamps).to_numpy(zero_copy_only=False)
+        df['day_of_week'] = pc.day_of_week(timestamps).to_numpy(zero_copy_only=False)
+        df['month'] = pc.month(timestamps).to_numpy(zero_copy_only=False)
         
         # Add transaction cost if gas data available
         if 'gas_used' in df.columns and 'gas_price' in df.columns:
@@ -110,7 +124,7 @@ class DataProcessor:
         if 'price_usd' in df.columns:
             df['amount_usd'] = df['amount'] * df['price_usd']
         
-        # Sort by timestamp for time-series analysis
+        # Sort by wallet and timestamp for time-series analysis
         df = df.sort_values(['wallet_address', 'timestamp'])
         
         return df
@@ -125,37 +139,49 @@ class DataProcessor:
         Returns:
             DataFrame with wallet-level summaries
         """
-        wallet_stats = []
+        grouped = df.groupby('wallet_address', observed=True, sort=False)
         
-        for wallet in df['wallet_address'].unique():
-            wallet_data = df[df['wallet_address'] == wallet].copy()
-            
-            # Basic transaction statistics
-            stats = {
-                'wallet_address': wallet,
-                'total_transactions': len(wallet_data),
-                'first_transaction': wallet_data['timestamp'].min(),
-                'last_transaction': wallet_data['timestamp'].max(),
-                'days_active': (wallet_data['timestamp'].max() - wallet_data['timestamp'].min()).days + 1,
-            }
-            
-            # Action-specific counts
-            action_counts = wallet_data['action'].value_counts()
-            for action in self.valid_actions:
-                stats[f'{action}_count'] = action_counts.get(action, 0)
-            
-            # Amount statistics
-            stats.update({
-                'total_amount': wallet_data['amount'].sum(),
-                'avg_amount': wallet_data['amount'].mean(),
-                'median_amount': wallet_data['amount'].median(),
-                'std_amount': wallet_data['amount'].std(),
-            })
-            
-            # Asset diversity
-            if 'asset' in wallet_data.columns:
-                stats['unique_assets'] = wallet_data['asset'].nunique()
-            
-            wallet_stats.append(stats)
-        
-        return pd.DataFrame(wallet_stats)
\ No newline at end of file
+        # Basic transaction and amount statistics
+        agg_spec = {
+            'timestamp': ['size', 'min', 'max'],
+            'amount': ['sum', 'mean', 'median', 'std'],
+        }
+        if 'asset' in df.columns:
+            agg_spec['asset'] = ['nunique']
+        summary = grouped.agg(agg_spec)
+        summary.columns = ['_'.join(col) for col in summary.columns]
+        summary = summary.rename(columns={
+            'timestamp_size': 'total_transactions',
+            'timestamp_min': 'first_transaction',
+            'timestamp_max': 'last_transaction',
+            'amount_sum': 'total_amount',
+            'amount_mean': 'avg_amount',
+            'amount_median': 'median_amount',
+            'amount_std': 'std_amount',
+            'asset_nunique': 'unique_assets',
+        })
+        summary.insert(
+            3, 'days_active',
+            (summary['last_transaction'] - summary['first_transaction']).dt.days + 1
+        )
+        
+        # Action-specific counts
+        action_counts = df.pivot_table(
+            index='wallet_address', columns='action', aggfunc='size',
+            fill_value=0, observed=True
+        )
+        action_counts = action_counts.reindex(
+            index=summary.index, columns=list(self.valid_actions), fill_value=0
+        )
+        action_counts.columns = [f'{action}_count' for action in action_counts.columns]
+        
+        summary = summary.join(action_counts)
+        column_order = (
+            ['total_transactions', 'first_transaction', 'last_transaction', 'days_active']
+            + list(action_counts.columns)
+            + ['total_amount', 'avg_amount', 'median_amount', 'std_amount']
+        )
+        if 'unique_assets' in summary.columns:
+            column_order.append('unique_assets')
+        
+        return summary[column_order].reset_index()
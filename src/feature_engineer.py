@@ -4,20 +4,30 @@ Feature engineering module for extracting behavioral patterns from DeFi transact
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import logging
-from typing import Dict, List
-from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+NAT = np.iinfo(np.int64).min
+NS_PER_DAY = 86_400 * 10**9
+# Finite stand-in for ratios whose denominator is zero, so features stay finite
+RATIO_CAP = 1e9
 
 class FeatureEngineer:
     """Extracts meaningful features from processed transaction data."""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self.actions = ['deposit', 'borrow', 'repay', 'redeemunderlying', 'liquidationcall']
     
     def engineer_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Engineer comprehensive features for credit scoring.
         
+        All features are computed as grouped aggregations over the whole
+        transaction frame rather than by filtering it once per wallet.
+        
         Args:
             df: Processed transaction DataFrame
             
@@ -26,244 +36,345 @@ class FeatureEngineer:
         """
         self.logger.info("Engineering features from transaction data...")
         
-        features_list = []
-        
-        for wallet in df['wallet_address'].unique():
-            wallet_data = df[df['wallet_address'] == wallet].copy()
-            features = self._extract_wallet_features(wallet_data)
-            features['wallet_address'] = wallet
-            features_list.append(features)
-        
-        features_df = pd.DataFrame(features_list)
+        ctx = self._build_context(df)
+        wallets = ctx['wallets']
+        
+        # Each helper writes one aligned array per feature into cols
+        cols = {}
+        self._basic_transaction_features(df, ctx, cols)
+        self._behavioral_pattern_features(df, ctx, cols)
+        self._risk_assessment_features(df, ctx, cols)
+        self._portfolio_management_features(df, ctx, cols)
+        self._temporal_features(df, ctx, cols)
+        self._bot_detection_features(df, ctx, cols)
+        
+        # Single precision is ample for these features and halves downstream scans
+        features_df = pd.DataFrame({
+            name: values.astype(np.float32) if values.dtype == np.float64 else values
+            for name, values in cols.items()
+        })
+        features_df['wallet_address'] = wallets.to_numpy()
         self.logger.info(f"Engineered {len(features_df.columns)-1} features for {len(features_df)} wallets")
         
         return features_df
     
-    def _extract_wallet_features(self, wallet_data: pd.DataFrame) -> Dict:
-        """Extract comprehensive features for a single wallet."""
-        features = {}
-        
-        # Basic transaction features
-        features.update(self._basic_transaction_features(wallet_data))
-        
-        # Behavioral pattern features
-        features.update(self._behavioral_pattern_features(wallet_data))
-        
-        # Risk assessment features
-        features.update(self._risk_assessment_features(wallet_data))
+    def _build_context(self, df: pd.DataFrame) -> Dict:
+        """Intermediates shared by the feature helpers (codes, group sizes, timestamps, totals, intervals)."""
+        grouped = df.groupby('wallet_address', sort=False, observed=True)
+        total_transactions = grouped.size()
+        ctx = {
+            'grouped': grouped,
+            'wallets': total_transactions.index,
+            'total_transactions': total_transactions,
+            'wallet_codes': grouped.ngroup().to_numpy(),
+            'action_codes': self._action_codes(df['action']),
+            'days': df['timestamp'].dt.normalize(),
+            'timestamps_ns': df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        }
+        ctx['action_counts'], ctx['action_amounts'] = self._action_totals(df, ctx)
+        (ctx['first_ns'], ctx['last_ns'],
+         ctx['interval_wallets'], ctx['intervals']) = self._transaction_timeline(df, ctx)
+        ctx['interval_stats'] = self._interval_stats(ctx)
+        return ctx
+    
+    def _action_codes(self, actions: pd.Series) -> np.ndarray:
+        """Integer code of each action in self.actions order (-1 for unknown or missing)."""
+        if isinstance(actions.dtype, pd.CategoricalDtype) and list(actions.cat.categories) == self.actions:
+            return actions.cat.codes.to_numpy()
+        return pd.Categorical(actions, categories=self.actions).codes
+    
+    def _action_totals(self, df: pd.DataFrame, ctx: Dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Per-wallet counts and amount sums for each action, plus an 'other' column."""
+        wallets = ctx['wallets']
+        columns = self.actions + ['other']
+        n_columns = len(columns)
         
-        # Portfolio management features
-        features.update(self._portfolio_management_features(wallet_data))
+        wallet_codes = ctx['wallet_codes']
+        action_codes = np.where(ctx['action_codes'] >= 0, ctx['action_codes'], n_columns - 1)
+        known = wallet_codes >= 0
         
-        # Time-based features
-        features.update(self._temporal_features(wallet_data))
+        bins = wallet_codes[known] * n_columns + action_codes[known]
+        amounts = np.nan_to_num(df['amount'].to_numpy(dtype=float)[known])
+        size = len(wallets) * n_columns
         
-        # Bot detection features
-        features.update(self._bot_detection_features(wallet_data))
+        counts = np.bincount(bins, minlength=size).reshape(-1, n_columns)
+        sums = np.bincount(bins, weights=amounts, minlength=size).reshape(-1, n_columns)
         
-        return features
+        return (pd.DataFrame(counts, index=wallets, columns=columns),
+                pd.DataFrame(sums, index=wallets, columns=columns))
+    
+    def _transaction_timeline(self, df: pd.DataFrame, ctx: Dict) -> Tuple[np.ndarray, ...]:
+        """First/last timestamp of each wallet, and the wallet code and length in seconds of each interval."""
+        wallet_codes = ctx['wallet_codes']
+        timestamps = ctx['timestamps_ns']
+        has_time = (wallet_codes >= 0) & (timestamps != NAT)
+        wallet_codes = wallet_codes[has_time]
+        timestamps = timestamps[has_time]
+        
+        # Skip the sort when rows are already grouped by wallet in time order
+        same_wallet = wallet_codes[1:] == wallet_codes[:-1]
+        in_order = (wallet_codes[1:] > wallet_codes[:-1]) | (
+            same_wallet & (timestamps[1:] >= timestamps[:-1])
+        )
+        if not in_order.all():
+            order = np.lexsort((timestamps, wallet_codes))
+            wallet_codes = wallet_codes[order]
+            timestamps = timestamps[order]
+        
+        first_ns = np.full(len(ctx['wallets']), NAT)
+        last_ns = np.full(len(ctx['wallets']), NAT)
+        if len(timestamps):
+            starts = np.flatnonzero(np.r_[True, wallet_codes[1:] != wallet_codes[:-1]])
+            ends = np.r_[starts[1:], len(timestamps)] - 1
+            first_ns[wallet_codes[starts]] = timestamps[starts]
+            last_ns[wallet_codes[starts]] = timestamps[ends]
+        
+        same_wallet = wallet_codes[1:] == wallet_codes[:-1]
+        intervals = np.diff(timestamps)[same_wallet] / 1e9
+        return first_ns, last_ns, wallet_codes[1:][same_wallet], intervals
     
-    def _basic_transaction_features(self, data: pd.DataFrame) -> Dict:
+    def _elapsed_days(self, later_ns, earlier_ns) -> np.ndarray:
+        """Whole days between int64 nanosecond timestamps (NaN where either is NAT)."""
+        valid = (later_ns != NAT) & (earlier_ns != NAT)
+        days = (np.where(valid, later_ns, 0) - np.where(valid, earlier_ns, 0)) // NS_PER_DAY
+        return days if valid.all() else np.where(valid, days, np.nan)
+    
+    def _period_variance(self, ctx: Dict, periods: np.ndarray) -> np.ndarray:
+        """Variance of each wallet's transaction counts across its active periods (0 if fewer than two)."""
+        n_wallets = len(ctx['wallets'])
+        periods = np.asarray(periods, dtype=float)
+        known = (ctx['wallet_codes'] >= 0) & ~np.isnan(periods)
+        
+        n_periods = int(periods[known].max()) + 1 if known.any() else 1
+        keys = ctx['wallet_codes'][known] * n_periods + periods[known].astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        period_wallets = keys // n_periods
+        
+        active = np.bincount(period_wallets, minlength=n_wallets)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.bincount(period_wallets, weights=counts, minlength=n_wallets) / active
+            squares = np.bincount(period_wallets, weights=(counts - mean[period_wallets]) ** 2,
+                                  minlength=n_wallets)
+            return np.where(active > 1, squares / (active - 1), 0.0)
+    
+    def _interval_stats(self, ctx: Dict) -> pd.DataFrame:
+        """Count, mean, std, min, max and modal count of each wallet's intervals."""
+        wallets = ctx['wallets']
+        n_wallets = len(wallets)
+        interval_wallets = ctx['interval_wallets']
+        intervals = ctx['intervals']
+        
+        count = np.bincount(interval_wallets, minlength=n_wallets)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.bincount(interval_wallets, weights=intervals, minlength=n_wallets) / count
+            deviations = intervals - mean[interval_wallets]
+            squares = np.bincount(interval_wallets, weights=deviations ** 2, minlength=n_wallets)
+            std = np.where(count > 1, np.sqrt(squares / (count - 1)), np.nan)
+        
+        minimum = np.full(n_wallets, np.nan)
+        maximum = np.full(n_wallets, np.nan)
+        if len(intervals):
+            starts = np.flatnonzero(np.r_[True, interval_wallets[1:] != interval_wallets[:-1]])
+            segment_wallets = interval_wallets[starts]
+            minimum[segment_wallets] = np.minimum.reduceat(intervals, starts)
+            maximum[segment_wallets] = np.maximum.reduceat(intervals, starts)
+        mode_count = self._top_value_count(ctx, interval_wallets, intervals)
+        
+        return pd.DataFrame({'count': count, 'mean': mean, 'std': std, 'min': minimum,
+                             'max': maximum, 'mode_count': mode_count}, index=wallets)
+    
+    def _top_value_count(self, ctx: Dict, wallet_codes: np.ndarray, values) -> np.ndarray:
+        """Count of each wallet's most frequent value (NaN for wallets without values)."""
+        value_codes, uniques = pd.factorize(values)
+        n_values = max(len(uniques), 1)
+        known = (wallet_codes >= 0) & (value_codes >= 0)
+        keys = wallet_codes[known].astype(np.int64) * n_values + value_codes[known]
+        keys, counts = np.unique(keys, return_counts=True)
+        
+        top_count = np.full(len(ctx['wallets']), np.nan)
+        if len(keys):
+            key_wallets = keys // n_values
+            starts = np.flatnonzero(np.r_[True, key_wallets[1:] != key_wallets[:-1]])
+            top_count[key_wallets[starts]] = np.maximum.reduceat(counts, starts)
+        return top_count
+    
+    def _column(self, values, ctx: Dict) -> np.ndarray:
+        """Align a per-wallet Series to the wallet order, or broadcast a scalar."""
+        if np.isscalar(values):
+            return np.full(len(ctx['wallets']), values)
+        return values.reindex(ctx['wallets']).to_numpy()
+    
+    def _basic_transaction_features(self, df: pd.DataFrame, ctx: Dict, cols: Dict) -> None:
         """Extract basic transaction statistics."""
-        features = {}
+        grouped = ctx['grouped']
+        action_counts = ctx['action_counts']
         
         # Transaction counts
-        features['total_transactions'] = len(data)
-        features['unique_days_active'] = data['timestamp'].dt.date.nunique()
+        total_actions = ctx['total_transactions']
+        cols['total_transactions'] = total_actions.to_numpy()
+        cols['unique_days_active'] = self._column(ctx['days'].groupby(
+            df['wallet_address'], sort=False, observed=True
+        ).nunique(), ctx)
         
         # Action-specific counts and ratios
-        action_counts = data['action'].value_counts()
-        total_actions = len(data)
-        
-        for action in ['deposit', 'borrow', 'repay', 'redeemunderlying', 'liquidationcall']:
-            count = action_counts.get(action, 0)
-            features[f'{action}_count'] = count
-            features[f'{action}_ratio'] = count / total_actions if total_actions > 0 else 0
+        for action in self.actions:
+            count = action_counts[action]
+            cols[f'{action}_count'] = count.to_numpy()
+            cols[f'{action}_ratio'] = (count / total_actions).to_numpy()
         
         # Amount statistics
-        amounts = data['amount']
-        features.update({
-            'total_amount': amounts.sum(),
-            'avg_amount': amounts.mean(),
-            'median_amount': amounts.median(),
-            'std_amount': amounts.std(),
-            'min_amount': amounts.min(),
-            'max_amount': amounts.max(),
-            'amount_cv': amounts.std() / amounts.mean() if amounts.mean() > 0 else 0
-        })
-        
-        return features
+        amounts = grouped['amount'].agg(['mean', 'median', 'std', 'min', 'max'])
+        cols['total_amount'] = ctx['action_amounts'].to_numpy().sum(axis=1)
+        cols['avg_amount'] = amounts['mean'].to_numpy()
+        cols['median_amount'] = amounts['median'].to_numpy()
+        cols['std_amount'] = amounts['std'].to_numpy()
+        cols['min_amount'] = amounts['min'].to_numpy()
+        cols['max_amount'] = amounts['max'].to_numpy()
+        cols['amount_cv'] = (amounts['std'] / amounts['mean']).where(amounts['mean'] > 0, 0).to_numpy()
     
-    def _behavioral_pattern_features(self, data: pd.DataFrame) -> Dict:
+    def _behavioral_pattern_features(self, df: pd.DataFrame, ctx: Dict, cols: Dict) -> None:
         """Extract behavioral pattern indicators."""
-        features = {}
+        interval_stats = ctx['interval_stats']
+        multiple_transactions = ctx['total_transactions'] > 1
         
         # Transaction frequency patterns
-        data_sorted = data.sort_values('timestamp')
-        if len(data_sorted) > 1:
-            time_diffs = data_sorted['timestamp'].diff().dt.total_seconds()
-            features.update({
-                'avg_time_between_transactions': time_diffs.mean(),
-                'std_time_between_transactions': time_diffs.std(),
-                'min_time_between_transactions': time_diffs.min(),
-                'max_time_between_transactions': time_diffs.max()
-            })
-        else:
-            features.update({
-                'avg_time_between_transactions': 0,
-                'std_time_between_transactions': 0,
-                'min_time_between_transactions': 0,
-                'max_time_between_transactions': 0
-            })
+        for stat in ['mean', 'std', 'min', 'max']:
+            name = 'avg' if stat == 'mean' else stat
+            cols[f'{name}_time_between_transactions'] = (
+                interval_stats[stat].where(multiple_transactions, 0).to_numpy()
+            )
         
         # Activity consistency
-        daily_counts = data.groupby(data['timestamp'].dt.date).size()
-        features.update({
-            'activity_consistency': 1.0 / (daily_counts.std() + 1),
-            'max_daily_transactions': daily_counts.max() if not daily_counts.empty else 0,
-            'avg_daily_transactions': daily_counts.mean() if not daily_counts.empty else 0
-        })
-        
-        # Time-of-day patterns
-        hourly_activity = data['hour'].value_counts()
-        features['activity_hours_spread'] = hourly_activity.count()
-        features['most_active_hour'] = hourly_activity.index[0] if not hourly_activity.empty else 0
-        
-        return features
+        days = ctx['days']
+        daily_counts = df.groupby([df['wallet_address'], days], sort=False, observed=True).size()
+        daily_stats = daily_counts.groupby(level=0, sort=False, observed=True).agg(
+            ['std', 'max', 'mean']
+        ).reindex(ctx['wallets'])
+        cols['activity_consistency'] = (1.0 / (daily_stats['std'] + 1)).to_numpy()
+        cols['max_daily_transactions'] = daily_stats['max'].fillna(0).to_numpy()
+        cols['avg_daily_transactions'] = daily_stats['mean'].fillna(0).to_numpy()
+        
+        # Time-of-day patterns (ties resolve to the hour seen first, as value_counts does)
+        hourly_activity = df.groupby(['wallet_address', 'hour'], sort=False, observed=True).size()
+        hourly_activity = hourly_activity.rename('count').reset_index()
+        cols['activity_hours_spread'] = hourly_activity.groupby(
+            'wallet_address', sort=False, observed=True
+        ).size().reindex(ctx['wallets'], fill_value=0).to_numpy()
+        most_active = hourly_activity.sort_values('count', ascending=False, kind='stable')
+        most_active = most_active.drop_duplicates('wallet_address').set_index('wallet_address')['hour']
+        cols['most_active_hour'] = most_active.reindex(ctx['wallets'], fill_value=0).to_numpy()
     
-    def _risk_assessment_features(self, data: pd.DataFrame) -> Dict:
+    def _risk_assessment_features(self, df: pd.DataFrame, ctx: Dict, cols: Dict) -> None:
         """Extract risk-related features."""
-        features = {}
+        action_counts = ctx['action_counts']
+        action_amounts = ctx['action_amounts']
         
         # Liquidation analysis
-        liquidations = data[data['action'] == 'liquidationcall']
-        features.update({
-            'liquidation_count': len(liquidations),
-            'liquidation_ratio': len(liquidations) / len(data) if len(data) > 0 else 0,
-            'days_since_last_liquidation': (data['timestamp'].max() - liquidations['timestamp'].max()).days 
-                                         if not liquidations.empty else 9999
-        })
+        is_liquidation = ctx['action_codes'] == self.actions.index('liquidationcall')
+        liquidation_count = action_counts['liquidationcall']
+        last_liquidation = np.full(len(ctx['wallets']), NAT)
+        np.maximum.at(last_liquidation, ctx['wallet_codes'][is_liquidation],
+                      ctx['timestamps_ns'][is_liquidation])
+        days_since_liquidation = self._elapsed_days(ctx['last_ns'], last_liquidation)
+        cols['liquidation_count'] = liquidation_count.to_numpy()
+        cols['liquidation_ratio'] = (liquidation_count / ctx['total_transactions']).to_numpy()
+        cols['days_since_last_liquidation'] = np.where(
+            liquidation_count.to_numpy() > 0, days_since_liquidation, 9999
+        )
         
         # Borrowing behavior
-        borrows = data[data['action'] == 'borrow']
-        repays = data[data['action'] == 'repay']
+        total_borrowed = action_amounts['borrow']
+        total_repaid = action_amounts['repay']
         
-        total_borrowed = borrows['amount'].sum() if not borrows.empty else 0
-        total_repaid = repays['amount'].sum() if not repays.empty else 0
-        
-        features.update({
-            'total_borrowed': total_borrowed,
-            'total_repaid': total_repaid,
-            'repayment_ratio': total_repaid / total_borrowed if total_borrowed > 0 else 1.0,
-            'outstanding_debt': max(0, total_borrowed - total_repaid)
-        })
+        cols['total_borrowed'] = total_borrowed.to_numpy()
+        cols['total_repaid'] = total_repaid.to_numpy()
+        cols['repayment_ratio'] = (total_repaid / total_borrowed).where(total_borrowed > 0, 1.0).to_numpy()
+        cols['outstanding_debt'] = (total_borrowed - total_repaid).clip(lower=0).to_numpy()
         
         # Leverage indicators
-        deposits = data[data['action'] == 'deposit']
-        total_deposited = deposits['amount'].sum() if not deposits.empty else 0
+        total_deposited = action_amounts['deposit']
         
-        features.update({
-            'leverage_ratio': total_borrowed / total_deposited if total_deposited > 0 else 0,
-            'deposit_to_borrow_ratio': total_deposited / total_borrowed if total_borrowed > 0 else float('inf')
-        })
-        
-        return features
+        cols['leverage_ratio'] = (total_borrowed / total_deposited).where(total_deposited > 0, 0).to_numpy()
+        cols['deposit_to_borrow_ratio'] = (total_deposited / total_borrowed).where(
+            total_borrowed > 0, RATIO_CAP
+        ).to_numpy()
     
-    def _portfolio_management_features(self, data: pd.DataFrame) -> Dict:
+    def _portfolio_management_features(self, df: pd.DataFrame, ctx: Dict, cols: Dict) -> None:
         """Extract portfolio management indicators."""
-        features = {}
+        grouped = ctx['grouped']
+        action_counts = ctx['action_counts']
         
         # Asset diversification
-        if 'asset' in data.columns:
-            unique_assets = data['asset'].nunique()
-            asset_counts = data['asset'].value_counts()
+        if 'asset' in df.columns:
+            top_asset_count = self._top_value_count(ctx, ctx['wallet_codes'], df['asset'])
+            asset_concentration = top_asset_count / ctx['total_transactions'].to_numpy()
             
-            features.update({
-                'unique_assets': unique_assets,
-                'asset_concentration': asset_counts.iloc[0] / len(data) if not asset_counts.empty else 0,
-                'asset_diversity_score': 1.0 - (asset_counts.iloc[0] / len(data)) if not asset_counts.empty else 0
-            })
+            cols['unique_assets'] = self._column(grouped['asset'].nunique(), ctx)
+            cols['asset_concentration'] = np.nan_to_num(asset_concentration)
+            cols['asset_diversity_score'] = np.nan_to_num(1.0 - asset_concentration)
         else:
-            features.update({
-                'unique_assets': 1,
-                'asset_concentration': 1.0,
-                'asset_diversity_score': 0.0
-            })
+            cols['unique_assets'] = self._column(1, ctx)
+            cols['asset_concentration'] = self._column(1.0, ctx)
+            cols['asset_diversity_score'] = self._column(0.0, ctx)
         
         # Position management
-        deposits = data[data['action'] == 'deposit']
-        withdrawals = data[data['action'] == 'redeemunderlying']
+        deposits = action_counts['deposit']
+        withdrawals = action_counts['redeemunderlying']
         
-        features.update({
-            'position_changes': len(deposits) + len(withdrawals),
-            'deposit_withdrawal_ratio': len(deposits) / len(withdrawals) if len(withdrawals) > 0 else float('inf')
-        })
-        
-        return features
+        cols['position_changes'] = (deposits + withdrawals).to_numpy()
+        cols['deposit_withdrawal_ratio'] = (deposits / withdrawals).where(
+            withdrawals > 0, RATIO_CAP
+        ).to_numpy()
     
-    def _temporal_features(self, data: pd.DataFrame) -> Dict:
+    def _temporal_features(self, df: pd.DataFrame, ctx: Dict, cols: Dict) -> None:
         """Extract time-based behavioral features."""
-        features = {}
-        
         # Account age and activity span
-        first_tx = data['timestamp'].min()
-        last_tx = data['timestamp'].max()
-        account_age_days = (last_tx - first_tx).days + 1
-        
-        features.update({
-            'account_age_days': account_age_days,
-            'transactions_per_day': len(data) / account_age_days if account_age_days > 0 else 0,
-            'days_since_last_activity': (datetime.now() - last_tx).days
-        })
-        
-        # Weekly and monthly patterns
-        weekly_activity = data.groupby(data['timestamp'].dt.isocalendar().week).size()
-        monthly_activity = data.groupby(data['timestamp'].dt.month).size()
-        
-        features.update({
-            'weekly_activity_variance': weekly_activity.var() if len(weekly_activity) > 1 else 0,
-            'monthly_activity_variance': monthly_activity.var() if len(monthly_activity) > 1 else 0
-        })
-        
-        return features
+        account_age_days = self._elapsed_days(ctx['last_ns'], ctx['first_ns']) + 1
+        now_ns = pd.Timestamp.now(tz=df['timestamp'].dt.tz).value
+        
+        cols['account_age_days'] = account_age_days
+        with np.errstate(invalid='ignore'):
+            cols['transactions_per_day'] = np.where(
+                account_age_days > 0, ctx['total_transactions'].to_numpy() / account_age_days, 0
+            )
+        cols['days_since_last_activity'] = self._elapsed_days(now_ns, ctx['last_ns'])
+        
+        # Weekly and monthly patterns (ISO week numbers, not year-qualified)
+        timestamps = pa.array(df['timestamp'])
+        weeks = pc.iso_week(timestamps).to_numpy(zero_copy_only=False)
+        months = pc.month(timestamps).to_numpy(zero_copy_only=False)
+        cols['weekly_activity_variance'] = self._period_variance(ctx, weeks)
+        cols['monthly_activity_variance'] = self._period_variance(ctx, months)
     
-    def _bot_detection_features(self, data: pd.DataFrame) -> Dict:
+    def _bot_detection_features(self, df: pd.DataFrame, ctx: Dict, cols: Dict) -> None:
         """Extract features that help identify bot-like behavior."""
-        features = {}
+        total_transactions = ctx['total_transactions']
+        interval_stats = ctx['interval_stats']
         
         # Regular interval detection
-        if len(data) > 2:
-            data_sorted = data.sort_values('timestamp')
-            time_diffs = data_sorted['timestamp'].diff().dt.total_seconds().dropna()
-            
-            # Check for highly regular intervals
-            if len(time_diffs) > 0:
-                cv_time = time_diffs.std() / time_diffs.mean() if time_diffs.mean() > 0 else 0
-                features['time_regularity_score'] = 1.0 / (cv_time + 0.01)  # Higher for more regular
-                
-                # Check for exact interval matches
-                common_intervals = time_diffs.value_counts()
-                features['most_common_interval_ratio'] = common_intervals.iloc[0] / len(time_diffs) if not common_intervals.empty else 0
-            else:
-                features['time_regularity_score'] = 0
-                features['most_common_interval_ratio'] = 0
-        else:
-            features['time_regularity_score'] = 0
-            features['most_common_interval_ratio'] = 0
+        regular_candidates = (total_transactions > 2) & (interval_stats['count'] > 0)
+        
+        # Check for highly regular intervals
+        cv_time = (interval_stats['std'] / interval_stats['mean']).where(interval_stats['mean'] > 0, 0)
+        cols['time_regularity_score'] = (1.0 / (cv_time + 0.01)).where(regular_candidates, 0).to_numpy()
+        
+        # Check for exact interval matches
+        cols['most_common_interval_ratio'] = (
+            interval_stats['mode_count'] / interval_stats['count']
+        ).where(regular_candidates, 0).to_numpy()
         
         # Amount uniformity (bots often use similar amounts)
-        amount_counts = data['amount'].value_counts()
-        features['amount_uniformity_score'] = amount_counts.iloc[0] / len(data) if not amount_counts.empty else 0
+        top_amount_count = self._top_value_count(ctx, ctx['wallet_codes'], df['amount'])
+        cols['amount_uniformity_score'] = np.nan_to_num(top_amount_count / total_transactions.to_numpy())
         
         # Gas optimization patterns
-        if 'gas_used' in data.columns:
-            gas_values = data['gas_used'].value_counts()
-            features['gas_optimization_score'] = gas_values.iloc[0] / len(data) if not gas_values.empty else 0
+        if 'gas_used' in df.columns:
+            top_gas_count = self._top_value_count(ctx, ctx['wallet_codes'], df['gas_used'])
+            cols['gas_optimization_score'] = np.nan_to_num(top_gas_count / total_transactions.to_numpy())
         else:
-            features['gas_optimization_score'] = 0
-        
-        # Transaction complexity (bots typically have simple patterns)
-        action_sequence_complexity = len(set(data['action'].tolist())) / len(data) if len(data) > 0 else 0
-        features['transaction_complexity'] = action_sequence_complexity
+            cols['gas_optimization_score'] = self._column(0, ctx)
         
-        return features
\ No newline at end of file
+        # Transaction complexity (bots typically have simple patterns);
+        # actions outside the known vocabulary count as one extra kind
+        action_kinds = (ctx['action_counts'].to_numpy() > 0).sum(axis=1)
+        cols['transaction_complexity'] = action_kinds / total_transactions.to_numpy()
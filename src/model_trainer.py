@@ -7,12 +7,26 @@ import numpy as np
 import logging
 from typing import Tuple, Dict, Any
 import joblib
-from sklearn.model_selection import cross_val_score, TimeSeriesSplit
+from sklearn.model_selection import train_test_split, TimeSeriesSplit
 from sklearn.preprocessing import StandardScaler
 from sklearn.feature_selection import SelectKBest, f_regression
 from sklearn.metrics import mean_squared_error, r2_score
 import xgboost as xgb
 
+# Synthetic target factors: (feature, points at saturation, value at which it saturates)
+SYNTHETIC_TARGET_FACTORS = [
+    # Positive factors (increase score)
+    ('repayment_ratio', 200, 1.0),  # Perfect repayment gets +200
+    ('asset_diversity_score', 100, 1.0),  # Asset diversity gets +100
+    ('account_age_days', 150, 365),  # Older accounts get up to +150
+    ('transaction_complexity', 50, 0.5),  # Complex transactions get +50
+    # Negative factors (decrease score)
+    ('liquidation_ratio', -300, 0.1),  # Liquidations can reduce by -300
+    ('leverage_ratio', -200, 10.0),  # High leverage reduces score
+    ('time_regularity_score', -100, 5.0),  # Bot-like behavior reduces score
+    ('amount_uniformity_score', -150, 0.8),  # Uniform amounts suggest bots
+]
+
 class ModelTrainer:
     """Trains and validates machine learning models for credit scoring."""
     
@@ -20,6 +34,7 @@ class ModelTrainer:
         self.logger = logging.getLogger(__name__)
         self.scaler = StandardScaler()
         self.feature_selector = SelectKBest(f_regression, k=30)
+        self.train_medians = None
         
     def train_model(self, features_df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -36,21 +51,24 @@ class ModelTrainer:
         # Prepare features and create synthetic targets
         X, y = self._prepare_training_data(features_df)
         
-        # Feature preprocessing
-        X_processed = self._preprocess_features(X)
+        # Feature preprocessing (selection is skipped when every feature would be kept)
+        uses_selector = X.shape[1] > self.feature_selector.k
+        X_processed = self._preprocess_features(X, y, uses_selector)
         
-        # Train model
-        model = self._train_xgboost(X_processed, y)
+        # Train model, early-stopped on a holdout split
+        X_train, X_val, y_train, y_val = train_test_split(X_processed, y, test_size=0.2, random_state=42)
+        model = self._train_xgboost(X_train, y_train, X_val, y_val)
         
         # Validate model
-        self._validate_model(model, X_processed, y)
+        self._validate_model(model, X_train, y_train, X_val, y_val)
         
         # Package model components
         model_package = {
             'model': model,
             'scaler': self.scaler,
-            'feature_selector': self.feature_selector,
-            'feature_names': X.columns.tolist()
+            'feature_selector': self.feature_selector if uses_selector else None,
+            'feature_names': X.columns.tolist(),
+            'train_medians': self.train_medians
         }
         
         self.logger.info("Model training completed successfully")
@@ -64,9 +82,6 @@ class ModelTrainer:
         # Remove wallet address column
         X = features_df.drop('wallet_address', axis=1)
         
-        # Fill missing values
-        X = X.fillna(X.median())
-        
         # Create synthetic targets based on risk indicators
         y = self._create_synthetic_targets(features_df)
         
@@ -78,41 +93,18 @@ class ModelTrainer:
         Create synthetic credit scores based on risk indicators.
         This is a heuristic approach since we don't have ground truth scores.
         """
-        scores = np.full(len(features_df), 500.0)  # Start with neutral score
-        
-        # Positive factors (increase score)
-        positive_factors = [
-            ('repayment_ratio', 200, 1.0),  # Perfect repayment gets +200
-            ('asset_diversity_score', 100, 1.0),  # Asset diversity gets +100
-            ('account_age_days', 150, 365),  # Older accounts get up to +150
-            ('transaction_complexity', 50, 0.5),  # Complex transactions get +50
-        ]
-        
-        # Negative factors (decrease score)
-        negative_factors = [
-            ('liquidation_ratio', -300, 0.1),  # Liquidations can reduce by -300
-            ('leverage_ratio', -200, 10.0),  # High leverage reduces score
-            ('time_regularity_score', -100, 5.0),  # Bot-like behavior reduces score
-            ('amount_uniformity_score', -150, 0.8),  # Uniform amounts suggest bots
-        ]
-        
-        # Apply positive factors
-        for factor, max_points, max_value in positive_factors:
-            if factor in features_df.columns:
-                values = features_df[factor].fillna(0)
-                normalized = np.clip(values / max_value, 0, 1)
-                scores += normalized * max_points
-        
-        # Apply negative factors
-        for factor, max_penalty, penalty_threshold in negative_factors:
-            if factor in features_df.columns:
-                values = features_df[factor].fillna(0)
-                penalty_strength = np.clip(values / penalty_threshold, 0, 1)
-                scores += penalty_strength * max_penalty
-        
-        # Add noise for more realistic distribution
-        noise = np.random.normal(0, 25, len(scores))
-        scores += noise
+        # Each factor adds points * clip(value / scale, 0, 1) to a neutral score
+        factors = [f for f in SYNTHETIC_TARGET_FACTORS if f[0] in features_df.columns]
+        names = [name for name, _, _ in factors]
+        points = np.array([points for _, points, _ in factors], dtype=float)
+        scales = np.array([scale for _, _, scale in factors], dtype=float)
+        
+        factor_matrix = np.nan_to_num(features_df[names].to_numpy(dtype=float),
+                                      nan=0.0, posinf=np.inf, neginf=-np.inf)
+        normalized = np.clip(factor_matrix / scales, 0, 1)
+        
+        # Neutral score, weighted factors and noise for more realistic distribution
+        scores = 500.0 + normalized @ points + np.random.normal(0, 25, len(features_df))
         
         # Ensure scores are within 0-1000 range
         scores = np.clip(scores, 0, 1000)
@@ -120,55 +112,63 @@ class ModelTrainer:
         self.logger.info(f"Created synthetic targets - Mean: {scores.mean():.2f}, Std: {scores.std():.2f}")
         return scores
     
-    def _preprocess_features(self, X: pd.DataFrame) -> np.ndarray:
+    def _preprocess_features(self, X: pd.DataFrame, y: np.ndarray, uses_selector: bool) -> np.ndarray:
         """Preprocess features for training."""
-        # Handle infinite values
-        X = X.replace([np.inf, -np.inf], np.nan)
-        X = X.fillna(X.median())
+        # Handle missing values with medians kept for scoring
+        self.train_medians = X.median()
+        X = X.fillna(self.train_medians)
         
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
+        # Scale features (in single precision, matching WalletScorer)
+        X_scaled = self.scaler.fit_transform(X.to_numpy(dtype=np.float32))
         
         # Select best features
-        X_selected = self.feature_selector.fit_transform(X_scaled, 
-                                                        np.random.random(len(X)))  # Dummy target for selection
-        
-        return X_selected
+        if not uses_selector:
+            return X_scaled
+        return self.feature_selector.fit_transform(X_scaled, y)
     
-    def _train_xgboost(self, X: np.ndarray, y: np.ndarray) -> xgb.XGBRegressor:
-        """Train XGBoost model with optimized parameters."""
-        model = xgb.XGBRegressor(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.1,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        model.fit(X, y)
-        return model
+    def _train_xgboost(self, X_train: np.ndarray, y_train: np.ndarray,
+                       X_val: np.ndarray, y_val: np.ndarray) -> xgb.Booster:
+        """Train XGBoost model with optimized parameters, early-stopped on the holdout rows."""
+        dtrain = xgb.DMatrix(X_train, label=y_train)
+        dval = xgb.DMatrix(X_val, label=y_val)
+        
+        params = {
+            'objective': 'reg:squarederror',
+            'eval_metric': 'rmse',
+            'tree_method': 'hist',
+            'max_depth': 6,
+            'eta': 0.1,
+            'subsample': 0.8,
+            'colsample_bytree': 0.8,
+            'seed': 42
+        }
+        
+        booster = xgb.train(params, dtrain, num_boost_round=200, evals=[(dval, 'validation')],
+                            early_stopping_rounds=20, verbose_eval=False)
+        
+        # Keep only the trees up to the best holdout iteration
+        best_iteration = booster.best_iteration
+        booster = booster[:best_iteration + 1]
+        booster.set_attr(best_iteration=str(best_iteration))
+        return booster
     
-    def _validate_model(self, model: xgb.XGBRegressor, X: np.ndarray, y: np.ndarray):
-        """Validate model performance."""
-        # Cross-validation
-        cv_scores = cross_val_score(model, X, y, cv=5, scoring='neg_mean_squared_error')
-        rmse_scores = np.sqrt(-cv_scores)
-        
-        # Full model performance
-        y_pred = model.predict(X)
-        r2 = r2_score(y, y_pred)
-        rmse = np.sqrt(mean_squared_error(y, y_pred))
-        
-        self.logger.info(f"Model Validation Results:")
-        self.logger.info(f"  Cross-validation RMSE: {rmse_scores.mean():.2f} ± {rmse_scores.std():.2f}")
-        self.logger.info(f"  Training R²: {r2:.3f}")
-        self.logger.info(f"  Training RMSE: {rmse:.2f}")
-        
-        # Feature importance
-        if hasattr(model, 'feature_importances_'):
-            importances = model.feature_importances_
+    def _validate_model(self, model: xgb.Booster, X_train: np.ndarray, y_train: np.ndarray,
+                        X_val: np.ndarray, y_val: np.ndarray):
+        """Validate model performance on the training and holdout rows separately."""
+        best_iteration = int(model.attr('best_iteration'))
+        self.logger.info(f"Model Validation Results (best iteration {best_iteration}):")
+        for name, X, y in [('Training', X_train, y_train), ('Holdout', X_val, y_val)]:
+            y_pred = model.predict(xgb.DMatrix(X))
+            self.logger.info(f"  {name} R²: {r2_score(y, y_pred):.3f}")
+            self.logger.info(f"  {name} RMSE: {np.sqrt(mean_squared_error(y, y_pred)):.2f}")
+        
+        # Feature importance (share of average gain per split, as XGBRegressor.feature_importances_)
+        gains = model.get_score(importance_type='gain')
+        if gains:
+            importances = np.zeros(X_train.shape[1])
+            for name, gain in gains.items():
+                importances[int(name[1:])] = gain
+            importances /= importances.sum()
             top_features = np.argsort(importances)[-10:]
             self.logger.info("Top 10 Most Important Features:")
             for i, idx in enumerate(reversed(top_features)):
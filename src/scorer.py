@@ -5,6 +5,7 @@ Wallet scoring module for assigning credit scores.
 import pandas as pd
 import numpy as np
 import logging
+import xgboost as xgb
 from typing import Dict, Any
 
 class WalletScorer:
@@ -13,6 +14,10 @@ class WalletScorer:
     def __init__(self, model_package: Dict[str, Any] = None):
         self.logger = logging.getLogger(__name__)
         self.model_package = model_package
+        # Lower score bound of each risk category above 'Unacceptable'
+        self.risk_thresholds = np.array([400, 500, 600, 700, 800, 900])
+        self.risk_labels = np.array(['Unacceptable', 'Very Poor', 'Poor', 'Fair',
+                                     'Good', 'Very Good', 'Excellent'])
         
     def score_wallets(self, features_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -34,7 +39,11 @@ class WalletScorer:
         X_processed = self._preprocess_features(X)
         
         # Generate predictions
-        raw_scores = self.model_package['model'].predict(X_processed)
+        model = self.model_package['model']
+        if isinstance(model, xgb.Booster):
+            raw_scores = model.predict(xgb.DMatrix(X_processed))
+        else:
+            raw_scores = model.predict(X_processed)
         
         # Calibrate scores to 0-1000 range
         calibrated_scores = self._calibrate_scores(raw_scores)
@@ -46,62 +55,58 @@ class WalletScorer:
         })
         
         # Add risk categories
-        results['risk_category'] = results['credit_score'].apply(self._assign_risk_category)
+        results['risk_category'] = self._assign_risk_category(calibrated_scores)
         
         self.logger.info("Wallet scoring completed")
         return results.sort_values('credit_score', ascending=False)
     
     def _preprocess_features(self, X: pd.DataFrame) -> np.ndarray:
         """Preprocess features using saved preprocessing components."""
-        # Handle missing values and infinite values
-        X = X.replace([np.inf, -np.inf], np.nan)
-        X = X.fillna(X.median())
+        feature_names = self.model_package.get('feature_names')
+        if feature_names is not None:
+            X = X[feature_names]
+        values = X.to_numpy(dtype=np.float32, copy=True)
+        
+        # Handle missing values
+        medians = self.model_package.get('train_medians')
+        if medians is None:
+            # Packages saved before training medians were stored
+            medians = pd.DataFrame(values).median().to_numpy()
+        else:
+            medians = medians.reindex(X.columns).to_numpy()
+        rows, columns = np.nonzero(np.isnan(values))
+        values[rows, columns] = medians[columns]
         
-        # Apply saved scaler
-        X_scaled = self.model_package['scaler'].transform(X)
+        # Apply saved scaler (in place on the float32 copy)
+        values = self.model_package['scaler'].transform(values, copy=False)
         
         # Apply saved feature selector
-        X_selected = self.model_package['feature_selector'].transform(X_scaled)
-        
-        return X_selected
+        feature_selector = self.model_package.get('feature_selector')
+        if feature_selector is None:
+            return values
+        return values[:, feature_selector.get_support()]
     
     def _calibrate_scores(self, raw_scores: np.ndarray) -> np.ndarray:
-        """
-        Calibrate raw model scores to 0-1000 range with proper distribution.
-        """
-        # Apply percentile-based calibration for better distribution
-        percentiles = np.percentile(raw_scores, np.arange(0, 101, 1))
+        """Map raw scores to 0-1000 by mid-rank percentile (tied scores share a rank)."""
+        n = len(raw_scores)
+        order = np.argsort(raw_scores, kind='stable')
+        sorted_scores = raw_scores[order]
         
-        calibrated = np.zeros_like(raw_scores)
-        for i, score in enumerate(raw_scores):
-            # Find percentile rank
-            percentile_rank = np.searchsorted(percentiles, score) / 100.0
-            
-            # Map to 0-1000 with slight S-curve for better distribution
-            calibrated_score = 1000 * percentile_rank
-            calibrated[i] = calibrated_score
+        # Average 0-based rank of each run of tied scores
+        run_starts = np.flatnonzero(np.r_[True, sorted_scores[1:] != sorted_scores[:-1]])
+        run_ends = np.r_[run_starts[1:], n]
+        run_ranks = (run_starts + run_ends - 1) / 2.0
         
-        # Ensure bounds
-        calibrated = np.clip(calibrated, 0, 1000)
+        ranks = np.empty(n)
+        ranks[order] = np.repeat(run_ranks, run_ends - run_starts)
+        calibrated = (ranks + 0.5) / n * 1000.0
         
-        return calibrated
+        # Ensure bounds
+        return np.clip(calibrated, 0, 1000)
     
-    def _assign_risk_category(self, score: float) -> str:
-        """Assign risk category based on credit score."""
-        if score >= 900:
-            return "Excellent"
-        elif score >= 800:
-            return "Very Good"
-        elif score >= 700:
-            return "Good"
-        elif score >= 600:
-            return "Fair"
-        elif score >= 500:
-            return "Poor"
-        elif score >= 400:
-            return "Very Poor"
-        else:
-            return "Unacceptable"
+    def _assign_risk_category(self, scores: np.ndarray) -> np.ndarray:
+        """Assign risk categories based on credit scores."""
+        return self.risk_labels[np.searchsorted(self.risk_thresholds, scores, side='right')]
     
     def generate_score_insights(self, results: pd.DataFrame, features_df: pd.DataFrame) -> Dict[str, Any]:
         """Generate insights about the scoring results."""
@@ -0,0 +1,28 @@
+"""
+Reading and writing score and feature tables as CSV or Parquet.
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from pathlib import Path
+
+def is_parquet(path: str) -> bool:
+    """Whether a table path is a Parquet file (any other suffix means CSV)."""
+    return Path(path).suffix.lower() == '.parquet'
+
+def save_table(df: pd.DataFrame, path: str):
+    """Save a DataFrame as CSV or Parquet, chosen by the file suffix."""
+    if is_parquet(path):
+        df.to_parquet(path, engine='pyarrow', compression='zstd', index=False)
+    else:
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+
+def load_table(path: str, columns=None) -> pd.DataFrame:
+    """Load a CSV or Parquet file, chosen by the file suffix, reading only the requested columns."""
+    if is_parquet(path):
+        return pd.read_parquet(path, engine='pyarrow', columns=columns)
+    # Keep wallet addresses as strings; Arrow would otherwise parse short hex ones like 0x1 as integers
+    convert_options = pacsv.ConvertOptions(column_types={'wallet_address': pa.string()},
+                                           include_columns=columns or [])
+    return pacsv.read_csv(path, convert_options=convert_options).to_pandas()
@@ -2,9 +2,12 @@
 Unit tests for the DeFi credit scoring system.
 """
 
+import json
+import tempfile
 import unittest
 import pandas as pd
 import numpy as np
+import xgboost as xgb
 import sys
 from pathlib import Path
 
@@ -12,9 +15,11 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent / 'src'))
 
 from data_processor import DataProcessor
-from feature_engineer import FeatureEngineer
+from feature_engineer import FeatureEngineer, RATIO_CAP
 from model_trainer import ModelTrainer
 from scorer import WalletScorer
+from analyzer import ScoreAnalyzer
+from table_io import save_table, load_table
 
 class TestDataProcessor(unittest.TestCase):
     """Test data processing functionality."""
@@ -54,6 +59,18 @@ class TestDataProcessor(unittest.TestCase):
         self.assertIsInstance(summary, pd.DataFrame)
         self.assertEqual(len(summary), 1)  # One unique wallet
         self.assertIn('total_transactions', summary.columns)
+    
+    def test_load_large_integer_amounts(self):
+        """Test loading integer amounts beyond the uint64 range."""
+        raw = [dict(self.sample_data[0], amount=123456789012345678901234)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'transactions.json'
+            path.write_text(json.dumps(raw))
+            transactions = self.processor.load_transactions(str(path))
+        result = self.processor.process_transactions(transactions)
+        
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result['amount'].iloc[0], 1.2345678901234568e23)
 
 class TestFeatureEngineer(unittest.TestCase):
     """Test feature engineering functionality."""
@@ -78,15 +95,64 @@ class TestFeatureEngineer(unittest.TestCase):
         self.assertIn('wallet_address', features.columns)
         self.assertIn('total_transactions', features.columns)
         self.assertIn('deposit_count', features.columns)
+    
+    def test_feature_values(self):
+        """Test per-wallet feature values."""
+        features = self.engineer.engineer_features(self.sample_df).set_index('wallet_address')
+        
+        self.assertEqual(features.loc['0x123', 'total_transactions'], 2)
+        self.assertEqual(features.loc['0x456', 'total_transactions'], 1)
+        self.assertEqual(features.loc['0x123', 'deposit_count'], 1)
+        self.assertEqual(features.loc['0x123', 'borrow_count'], 1)
+        self.assertAlmostEqual(features.loc['0x123', 'total_amount'], 1500.0)
+        self.assertAlmostEqual(features.loc['0x123', 'avg_time_between_transactions'], 86400.0)
+        self.assertAlmostEqual(features.loc['0x123', 'min_time_between_transactions'], 86400.0)
+        self.assertEqual(features.loc['0x123', 'account_age_days'], 2)
+    
+    def test_feature_values_unsorted_input(self):
+        """Test that row order does not change the engineered features."""
+        columns = ['total_transactions', 'total_amount', 'avg_time_between_transactions',
+                   'min_time_between_transactions', 'max_time_between_transactions',
+                   'account_age_days', 'days_since_last_activity']
+        expected = self.engineer.engineer_features(self.sample_df).set_index('wallet_address')
+        shuffled = self.sample_df.iloc[::-1].reset_index(drop=True)
+        features = self.engineer.engineer_features(shuffled).set_index('wallet_address')
+        
+        pd.testing.assert_frame_equal(features.loc[expected.index, columns], expected[columns])
+    
+    def test_zero_denominator_ratios(self):
+        """Test that ratios with a zero denominator are capped instead of infinite."""
+        borrow_only = pd.DataFrame({
+            'wallet_address': ['0x789'],
+            'action': ['borrow'],
+            'amount': [300.0],
+            'timestamp': pd.to_datetime(['2023-01-18']),
+            'hour': [9],
+            'day_of_week': [3],
+            'month': [1]
+        })
+        df = pd.concat([self.sample_df, borrow_only], ignore_index=True)
+        features = self.engineer.engineer_features(df).set_index('wallet_address')
+        
+        # 0x456 only deposits, so it has no borrows or withdrawals to divide by
+        self.assertEqual(features.loc['0x456', 'deposit_to_borrow_ratio'], RATIO_CAP)
+        self.assertEqual(features.loc['0x456', 'deposit_withdrawal_ratio'], RATIO_CAP)
+        
+        # 0x789 borrows without depositing
+        self.assertEqual(features.loc['0x789', 'leverage_ratio'], 0)
+        self.assertEqual(features.loc['0x789', 'deposit_to_borrow_ratio'], 0)
+        self.assertEqual(features.loc['0x789', 'deposit_withdrawal_ratio'], RATIO_CAP)
+        self.assertFalse(np.isinf(features.to_numpy(dtype=float)).any())
 
 class TestModelTrainer(unittest.TestCase):
     """Test model training functionality."""
     
-    def setUp(self):
-        self.trainer = ModelTrainer()
+    @classmethod
+    def setUpClass(cls):
+        cls.trainer = ModelTrainer()
         # Create minimal feature set for testing
         np.random.seed(42)
-        self.features_df = pd.DataFrame({
+        cls.features_df = pd.DataFrame({
             'wallet_address': [f'0x{i:040x}' for i in range(100)],
             'total_transactions': np.random.randint(1, 100, 100),
             'deposit_count': np.random.randint(0, 50, 100),
@@ -95,6 +161,20 @@ class TestModelTrainer(unittest.TestCase):
             'leverage_ratio': np.random.uniform(0, 5, 100),
             'liquidation_count': np.random.randint(0, 5, 100)
         })
+        
+        # Create a full engineered feature set from synthetic transactions
+        n_transactions = 2000
+        transactions = pd.DataFrame({
+            'wallet_address': [f'0x{i:040x}' for i in np.random.randint(0, 200, n_transactions)],
+            'action': np.random.choice(['deposit', 'borrow', 'repay', 'redeemunderlying', 'liquidationcall'],
+                                       n_transactions, p=[0.35, 0.25, 0.2, 0.15, 0.05]),
+            'amount': np.random.lognormal(6, 2, n_transactions),
+            'asset': np.random.choice(['USDC', 'DAI', 'WETH'], n_transactions),
+            'timestamp': pd.to_datetime(np.random.randint(1_600_000_000, 1_700_000_000, n_transactions),
+                                        unit='s').strftime('%Y-%m-%dT%H:%M:%SZ')
+        }).to_dict(orient='records')
+        processed_df = DataProcessor().process_transactions(transactions)
+        cls.wide_features_df = FeatureEngineer().engineer_features(processed_df)
     
     def test_train_model(self):
         """Test model training."""
@@ -104,18 +184,63 @@ class TestModelTrainer(unittest.TestCase):
         self.assertIn('model', model_package)
         self.assertIn('scaler', model_package)
         self.assertIn('feature_selector', model_package)
+    
+    def test_train_model_skips_selection_for_few_features(self):
+        """Test that feature sets no wider than k are packaged without a selector."""
+        model_package = self.trainer.train_model(self.features_df)
+        results = WalletScorer(model_package).score_wallets(self.features_df)
+        
+        self.assertIsNone(model_package['feature_selector'])
+        self.assertEqual(len(results), len(self.features_df))
+        self.assertTrue(results['credit_score'].between(0, 1000).all())
+    
+    def test_train_model_selects_features(self):
+        """Test feature selection on a full engineered feature set."""
+        X = self.wide_features_df.drop('wallet_address', axis=1)
+        self.assertGreater(X.shape[1], self.trainer.feature_selector.k)
+        
+        # A narrow frame trained first must not disable selection for later calls
+        self.trainer.train_model(self.features_df)
+        model_package = self.trainer.train_model(self.wide_features_df)
+        scorer = WalletScorer(model_package)
+        results = scorer.score_wallets(self.wide_features_df)
+        
+        self.assertIsNotNone(model_package['feature_selector'])
+        self.assertEqual(model_package['feature_selector'].get_support().sum(), 30)
+        self.assertEqual(scorer._preprocess_features(X).shape, (len(X), 30))
+        self.assertEqual(len(results), len(X))
+        self.assertTrue(results['credit_score'].between(0, 1000).all())
+    
+    def test_trained_booster_scoring(self):
+        """Test scoring with a trained package through the XGBoost Booster path."""
+        model_package = self.trainer.train_model(self.wide_features_df)
+        model = model_package['model']
+        
+        self.assertIsInstance(model, xgb.Booster)
+        self.assertEqual(model.num_boosted_rounds(), int(model.attr('best_iteration')) + 1)
+        
+        scorer = WalletScorer(model_package)
+        results = scorer.score_wallets(self.wide_features_df).set_index('wallet_address')
+        X = self.wide_features_df.drop('wallet_address', axis=1)
+        raw_scores = model.predict(xgb.DMatrix(scorer._preprocess_features(X)))
+        expected = scorer._calibrate_scores(raw_scores)
+        
+        np.testing.assert_allclose(
+            results.loc[self.wide_features_df['wallet_address'], 'credit_score'], expected)
+        self.assertGreater(results['credit_score'].nunique(), 1)
 
 class TestWalletScorer(unittest.TestCase):
     """Test wallet scoring functionality."""
     
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         # Create a mock model package
         np.random.seed(42)
         from sklearn.preprocessing import StandardScaler
         from sklearn.feature_selection import SelectKBest, f_regression
         from sklearn.ensemble import RandomForestRegressor
         
-        self.mock_model_package = {
+        cls.mock_model_package = {
             'model': RandomForestRegressor(n_estimators=10, random_state=42),
             'scaler': StandardScaler(),
             'feature_selector': SelectKBest(f_regression, k=5),
@@ -126,13 +251,13 @@ class TestWalletScorer(unittest.TestCase):
         X_mock = np.random.randn(100, 5)
         y_mock = np.random.randn(100)
         
-        X_scaled = self.mock_model_package['scaler'].fit_transform(X_mock)
-        X_selected = self.mock_model_package['feature_selector'].fit_transform(X_scaled, y_mock)
-        self.mock_model_package['model'].fit(X_selected, y_mock)
+        X_scaled = cls.mock_model_package['scaler'].fit_transform(X_mock)
+        X_selected = cls.mock_model_package['feature_selector'].fit_transform(X_scaled, y_mock)
+        cls.mock_model_package['model'].fit(X_selected, y_mock)
         
-        self.scorer = WalletScorer(self.mock_model_package)
+        cls.scorer = WalletScorer(cls.mock_model_package)
         
-        self.features_df = pd.DataFrame({
+        cls.features_df = pd.DataFrame({
             'wallet_address': ['0x123', '0x456'],
             'feature1': [1.0, 2.0],
             'feature2': [3.0, 4.0],
@@ -153,6 +278,106 @@ class TestWalletScorer(unittest.TestCase):
         
         # Check score range
         self.assertTrue(all(0 <= score <= 1000 for score in results['credit_score']))
+    
+    def test_calibrate_tied_scores(self):
+        """Test that tied raw scores get equal calibrated scores."""
+        scores = self.scorer._calibrate_scores(np.array([0.2, 0.5, 0.5, 0.9]))
+        
+        self.assertEqual(scores[1], scores[2])
+        self.assertLess(scores[0], scores[1])
+        self.assertLess(scores[2], scores[3])
+    
+    def test_risk_category_boundaries(self):
+        """Test risk categories at the threshold boundaries."""
+        categories = self.scorer._assign_risk_category(np.array([399, 400, 900]))
+        
+        self.assertEqual(list(categories), ['Unacceptable', 'Very Poor', 'Excellent'])
+    
+    def test_missing_values_use_training_medians(self):
+        """Test that missing features are filled with the training medians."""
+        feature_names = self.mock_model_package['feature_names']
+        medians = pd.Series([10.0, 20.0, 30.0, 40.0, 50.0], index=feature_names)
+        scorer = WalletScorer(dict(self.mock_model_package, train_medians=medians))
+        X = pd.DataFrame([[np.nan, 1.0, 2.0, 3.0, 4.0]], columns=feature_names)
+        
+        expected = self.mock_model_package['scaler'].transform(
+            np.array([[10.0, 1.0, 2.0, 3.0, 4.0]], dtype=np.float32))
+        np.testing.assert_allclose(scorer._preprocess_features(X), expected, rtol=1e-6)
+    
+    def test_missing_values_without_training_medians(self):
+        """Test that packages without training medians fall back to the batch medians."""
+        feature_names = self.mock_model_package['feature_names']
+        X = pd.DataFrame([[np.nan, 1.0, 2.0, 3.0, 4.0],
+                          [6.0, 1.0, 2.0, 3.0, 4.0]], columns=feature_names)
+        
+        expected = self.mock_model_package['scaler'].transform(
+            np.array([[6.0, 1.0, 2.0, 3.0, 4.0]] * 2, dtype=np.float32))
+        self.assertNotIn('train_medians', self.mock_model_package)
+        np.testing.assert_allclose(self.scorer._preprocess_features(X), expected, rtol=1e-6)
+
+class TestScoreAnalyzer(unittest.TestCase):
+    """Test score analysis functionality."""
+    
+    def setUp(self):
+        self.analyzer = ScoreAnalyzer()
+        self.scores_df = pd.DataFrame({
+            'wallet_address': ['0x1', '0x2', '0x3', '0x4'],
+            'credit_score': [250.0, 400.0, 699.0, 700.0],
+            'risk_category': ['Unacceptable', 'Very Poor', 'Fair', 'Good']
+        })
+        self.features_df = pd.DataFrame({
+            'wallet_address': ['0x1', '0x2', '0x3', '0x4'],
+            'total_transactions': [1, 10, 20, 40],
+            'repayment_ratio': [0.0, 0.5, 0.7, 1.0]
+        })
+    
+    def test_behavioral_patterns(self):
+        """Test behavioral pattern grouping by score range."""
+        merged_df = self.scores_df.merge(self.features_df, on='wallet_address')
+        patterns = self.analyzer._analyze_behavioral_patterns(merged_df)
+        
+        self.assertEqual(patterns['high_score']['count'], 1)
+        self.assertEqual(patterns['medium_score']['count'], 2)
+        self.assertEqual(patterns['low_score']['count'], 1)
+        self.assertAlmostEqual(patterns['medium_score']['total_transactions']['mean'], 15.0)
+        self.assertNotIn('leverage_ratio', patterns['high_score'])
+    
+    def test_score_buckets(self):
+        """Test score bucket boundaries and that invalid scores are left out."""
+        scores_df = pd.DataFrame({
+            'credit_score': [0.0, 399.0, 400.0, 999.5, 1000.0, np.nan, -5.0, 1200.0],
+            'risk_category': ['Unacceptable'] * 8
+        })
+        buckets = self.analyzer._analyze_score_distribution(scores_df)['bucket_distribution']
+        
+        self.assertEqual(buckets['0-99']['count'], 1)
+        self.assertEqual(buckets['300-399']['count'], 1)
+        self.assertEqual(buckets['400-499']['count'], 1)
+        self.assertEqual(buckets['900-999']['count'], 2)
+        self.assertEqual(sum(bucket['count'] for bucket in buckets.values()), 5)
+
+class TestTableIO(unittest.TestCase):
+    """Test CSV and Parquet table round trips."""
+    
+    def setUp(self):
+        self.scores_df = pd.DataFrame({
+            'wallet_address': ['0x1', '0x2'],
+            'credit_score': [250.5, 700.0],
+            'risk_category': ['Unacceptable', 'Good']
+        })
+    
+    def test_round_trip(self):
+        """Test that tables read back unchanged, in the format given by the suffix."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ['scores.csv', 'scores.parquet']:
+                path = str(Path(tmp_dir) / name)
+                save_table(self.scores_df, path)
+                
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(4) == b'PAR1', name.endswith('.parquet'))
+                pd.testing.assert_frame_equal(load_table(path), self.scores_df, check_dtype=False)
+                pd.testing.assert_frame_equal(load_table(path, columns=['credit_score']),
+                                              self.scores_df[['credit_score']], check_dtype=False)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file